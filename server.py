@@ -8,27 +8,79 @@ ping, and multi-vendor operation.
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import json
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
 from typing import Any
 
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 from mcp_network_common import (
     CommandValidator,
-    create_scrapli_conn,
-    error_response,
     get_device,
-    handle_ssh_errors,
     load_inventory,
-    ok_response,
     setup_logger,
 )
+from scrapli import AsyncScrapli
+from scrapli.exceptions import (
+    ScrapliAuthenticationFailed,
+    ScrapliConnectionError,
+    ScrapliTimeout,
+)
 
 load_dotenv()
 
 logger = setup_logger("CiscoMCPServer")
-mcp = FastMCP("Cisco Network Tools")
 
-DEVICES: dict[str, dict[str, Any]] = {}
+
+def _ok(**data: Any) -> str:
+    """Build the same payload as ok_response, serialized compactly.
+
+    Skipping indentation keeps json on its C encoder, which matters for
+    multi-megabyte outputs such as a full running-config.
+    """
+    return json.dumps({"status": "ok", **data}, separators=(",", ":"), ensure_ascii=False)
+
+
+_ERR_TEMPLATE = '{"status":"error","error":%s}'
+
+
+def _err(message: str) -> str:
+    """Build the same payload as error_response by filling a prebuilt template."""
+    return _ERR_TEMPLATE % json.dumps(message, ensure_ascii=False)
+
+
+# Failures that belong to one device (unreachable, bad credentials, unknown name)
+# rather than to the server; anything else is a bug and must not be masked.
+_DEVICE_ERRORS = (ScrapliAuthenticationFailed, ScrapliConnectionError, ScrapliTimeout, ValueError)
+
+
+def _device_error(exc: Exception) -> str:
+    """Describe one of _DEVICE_ERRORS for an error payload."""
+    if isinstance(exc, ScrapliAuthenticationFailed):
+        return f"Authentication failed: {exc}"
+    if isinstance(exc, (ScrapliConnectionError, ScrapliTimeout)):
+        return f"Connection error: {exc}"
+    return str(exc)
+
+
+def _handle_device_errors(fn: Callable[..., Awaitable[str]]) -> Callable[..., Awaitable[str]]:
+    """Return _DEVICE_ERRORS as compact error payloads; anything else propagates."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> str:
+        try:
+            return await fn(*args, **kwargs)
+        except _DEVICE_ERRORS as exc:
+            return _err(_device_error(exc))
+
+    return wrapper
+
 
 _PLATFORM_MAP = {
     "iosxe": "cisco_iosxe",
@@ -37,34 +89,289 @@ _PLATFORM_MAP = {
     "ios": "cisco_iosxe",
 }
 
-load_inventory("CISCO", DEVICES, default_fields={"platform": "iosxe"})
+# Trailing bytes of the read buffer scrapli searches for the prompt (its default
+# is 1000). A Cisco prompt always sits on the last line, well within this window.
+_PROMPT_SEARCH_DEPTH = 512
+
+# SSH-level keepalives let asyncssh notice a dead peer (device reload, NAT idle
+# timeout) within about interval * count_max seconds, so a stale pooled session
+# fails isalive() instead of hanging the next command until timeout_ops.
+_SSH_KEEPALIVE_INTERVAL = 30
+_SSH_KEEPALIVE_COUNT_MAX = 3
+
+
+@dataclass(slots=True)
+class Device:
+    """A Cisco inventory entry with its AsyncScrapli arguments resolved up front."""
+
+    host: str
+    username: str = "admin"
+    password: str = field(default="", repr=False)
+    platform: str = "iosxe"
+    port: int = 22
+    scrapli_kwargs: dict[str, Any] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.scrapli_kwargs = {
+            "host": self.host,
+            "auth_username": self.username,
+            "auth_password": self.password,
+            "platform": _PLATFORM_MAP.get(self.platform, "cisco_iosxe"),
+            "port": self.port,
+            "auth_strict_key": False,
+            "transport": "asyncssh",
+            "timeout_socket": 30,
+            "timeout_transport": 30,
+            "timeout_ops": 60,
+            "transport_options": {
+                "asyncssh": {
+                    "keepalive_interval": _SSH_KEEPALIVE_INTERVAL,
+                    "keepalive_count_max": _SSH_KEEPALIVE_COUNT_MAX,
+                }
+            },
+        }
+
+    @classmethod
+    def from_inventory(cls, entry: dict[str, Any]) -> Device:
+        return cls(
+            host=entry["host"],
+            username=entry.get("username", "admin"),
+            password=entry.get("password", ""),
+            platform=entry.get("platform", "iosxe"),
+            port=int(entry.get("port", 22)),
+        )
+
+
+DEVICES: dict[str, Device] = {}
+
+# Serialized cisco_list_devices payload, rebuilt by _load_devices().
+_LIST_RESPONSE = ""
+
+
+def _load_devices(inventory: dict[str, dict[str, Any]]) -> None:
+    """Fill DEVICES from raw inventory entries and rebuild the cached device listing.
+
+    Must be called again whenever the inventory is reloaded.
+    """
+    global _LIST_RESPONSE
+    DEVICES.clear()
+    for name, entry in inventory.items():
+        DEVICES[name] = Device.from_inventory(entry)
+    _LIST_RESPONSE = _ok(
+        devices={
+            name: {"host": dev.host, "platform": dev.platform, "port": dev.port}
+            for name, dev in DEVICES.items()
+        }
+    )
+
+
+_inventory: dict[str, dict[str, Any]] = {}
+load_inventory("CISCO", _inventory, default_fields={"platform": "iosxe"})
+_load_devices(_inventory)
 
 validator = CommandValidator()
 
+# Mode-switch lines cisco_configure strips because send_configs adds them itself.
+_CONFIG_WRAPPER_LINES = frozenset({"configure terminal", "conf t", "end"})
+
+
+# Cap on SSH sessions being opened at once across all devices, so a cold-start
+# burst (server restart followed by a wide cisco_show_batch) does not run dozens of
+# key exchanges and logins simultaneously, e.g. against a shared AAA server or
+# several inventory entries behind one sshd. It only gates the handshake: commands
+# on open sessions still run up to CISCO_MAX_CONCURRENCY at a time, and reused pool
+# entries never touch it. A single device already has at most one open in flight,
+# since opens happen under its pool lock.
+_OPEN_CONCURRENCY = int(os.getenv("CISCO_SSH_OPEN_CONCURRENCY", "8"))
+_OPEN_SEM = asyncio.Semaphore(_OPEN_CONCURRENCY)
+
+
+async def _open_conn(scrapli_kwargs: dict[str, Any]) -> AsyncScrapli:
+    """Open a new AsyncScrapli connection from a device's prebuilt arguments."""
+    conn = AsyncScrapli(**scrapli_kwargs)
+    # Only settable as a property; no driver accepts it as a constructor argument.
+    conn.comms_prompt_search_depth = _PROMPT_SEARCH_DEPTH
+    async with _OPEN_SEM:
+        await conn.open()
+    return conn
+
+
+# Connection pool: one open session per device, reused across tool calls so each
+# call pays only the command round-trip instead of TCP + SSH KEX + auth.
+_POOL_IDLE_TIMEOUT = float(os.getenv("CISCO_POOL_IDLE_TIMEOUT", "300"))
+_POOL_MAX_AGE = float(os.getenv("CISCO_POOL_MAX_AGE", "3600"))
+_POOL_PROBE_INTERVAL = float(os.getenv("CISCO_POOL_PROBE_INTERVAL", "60"))
+_POOL_PROBE_TIMEOUT = 5.0
+_POOL_REAP_INTERVAL = 30.0
+
+# Upper bound on devices queried at once by fan-out tools such as cisco_show_batch,
+# shared across concurrent tool calls.
+_MAX_CONCURRENCY = int(os.getenv("CISCO_MAX_CONCURRENCY", "20"))
+_BATCH_SEM = asyncio.Semaphore(_MAX_CONCURRENCY)
+
+
+@dataclass
+class _PoolEntry:
+    conn: Any
+    opened_at: float
+    last_used: float
+    last_checked: float = 0.0
+
+
+_POOL: dict[str, _PoolEntry] = {}
+_LOCKS: dict[str, asyncio.Lock] = {}
+
+
+def _device_lock(device_name: str) -> asyncio.Lock:
+    return _LOCKS.setdefault(device_name, asyncio.Lock())
+
+
+async def _close_conn(conn: Any) -> None:
+    """Close a connection, ignoring errors from an already-dead transport."""
+    with suppress(Exception):
+        await conn.close()
+
+
+async def _evict(device_name: str) -> None:
+    entry = _POOL.pop(device_name, None)
+    if entry is not None:
+        await _close_conn(entry.conn)
+
 
 async def _get_conn(device_name: str):
-    """Create an AsyncScrapli connection to the named device."""
+    """Return an open AsyncScrapli connection to the named device.
+
+    Reuses the pooled session when it is still alive and younger than the max age,
+    otherwise opens a new one. Callers must hold the device lock (see _pooled_conn).
+    """
     dev = get_device(device_name, DEVICES)
-    platform = _PLATFORM_MAP.get(dev.get("platform", "iosxe"), "cisco_iosxe")
-    return await create_scrapli_conn(dev, platform=platform)
+    now = time.monotonic()
+    entry = _POOL.get(device_name)
+    if entry is not None and (not entry.conn.isalive() or now - entry.opened_at > _POOL_MAX_AGE):
+        await _evict(device_name)
+        entry = None
+
+    if entry is None:
+        conn = await _open_conn(dev.scrapli_kwargs)
+        entry = _POOL[device_name] = _PoolEntry(conn=conn, opened_at=now, last_used=now)
+
+    entry.last_used = now
+    return entry.conn
+
+
+@asynccontextmanager
+async def _pooled_conn(device_name: str) -> AsyncIterator[Any]:
+    """Hold the device lock for the duration of an operation and yield its connection.
+
+    A session that fails mid-operation is evicted, since its channel may be left
+    waiting on a prompt that never arrives.
+    """
+    # Validate first so unknown names never get a lock in _LOCKS.
+    get_device(device_name, DEVICES)
+    async with _device_lock(device_name):
+        conn = await _get_conn(device_name)
+        try:
+            yield conn
+        except BaseException:
+            await _evict(device_name)
+            raise
+        entry = _POOL.get(device_name)
+        if entry is not None:
+            entry.last_used = time.monotonic()
+
+
+async def _probe(conn: Any) -> bool:
+    """Check a pooled session by sending a bare newline and waiting for the prompt."""
+    if not conn.isalive():
+        return False
+    try:
+        await conn.send_command("", timeout_ops=_POOL_PROBE_TIMEOUT)
+    except Exception:
+        return False
+    return True
+
+
+async def _reap_pool(now: float) -> None:
+    """Close pooled sessions that are idle, too old, or fail a health check.
+
+    Sessions idle for longer than the probe interval are probed so a dead one is
+    dropped here, rather than stalling the next tool call until timeout_ops.
+    """
+    for name, entry in list(_POOL.items()):
+        lock = _device_lock(name)
+        if lock.locked():
+            continue
+        expired = (
+            now - entry.last_used > _POOL_IDLE_TIMEOUT or now - entry.opened_at > _POOL_MAX_AGE
+        )
+        probe_due = now - max(entry.last_used, entry.last_checked) >= _POOL_PROBE_INTERVAL
+        if not (expired or probe_due):
+            continue
+        async with lock:
+            if _POOL.get(name) is not entry:
+                continue
+            if expired:
+                logger.info("Closing pooled connection to %s", name)
+                await _evict(name)
+            elif await _probe(entry.conn):
+                entry.last_checked = now
+            else:
+                logger.warning("Pooled connection to %s failed health check; closing", name)
+                await _evict(name)
+
+
+async def _close_pool() -> None:
+    for name in list(_POOL):
+        await _evict(name)
+
+
+# Paged running-config output, kept between page requests so reading page N does
+# not re-run the full "show running-config". Keyed by (device, command), held only
+# while more pages remain, dropped after the TTL (also by the reaper, for clients
+# that stop paging) and capped in size.
+_CONFIG_CACHE_TTL = 60.0
+_CONFIG_CACHE_MAX_ENTRIES = 8
+_CONFIG_CACHE: dict[tuple[str, str], tuple[str, float]] = {}
+
+
+def _purge_config_cache(now: float) -> None:
+    for key, (_, fetched_at) in list(_CONFIG_CACHE.items()):
+        if now - fetched_at >= _CONFIG_CACHE_TTL:
+            del _CONFIG_CACHE[key]
+
+
+@asynccontextmanager
+async def _lifespan(_server: FastMCP) -> AsyncIterator[None]:
+    """Run the pool reaper while the server is up and close pooled sessions on shutdown."""
+
+    async def reaper() -> None:
+        while True:
+            await asyncio.sleep(_POOL_REAP_INTERVAL)
+            now = time.monotonic()
+            _purge_config_cache(now)
+            await _reap_pool(now)
+
+    task = asyncio.create_task(reaper())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        await _close_pool()
+
+
+mcp = FastMCP("Cisco Network Tools", lifespan=_lifespan)
 
 
 @mcp.tool()
 async def cisco_list_devices() -> str:
     """List all Cisco devices in the inventory."""
-    result = {
-        name: {
-            "host": dev["host"],
-            "platform": dev.get("platform", "iosxe"),
-            "port": dev.get("port", 22),
-        }
-        for name, dev in DEVICES.items()
-    }
-    return ok_response(devices=result)
+    return _LIST_RESPONSE
 
 
 @mcp.tool()
-@handle_ssh_errors
+@_handle_device_errors
 async def cisco_show(device_name: str, command: str) -> str:
     """Execute a show command on a Cisco device.
 
@@ -74,18 +381,66 @@ async def cisco_show(device_name: str, command: str) -> str:
     """
     err = validator.validate_readonly(command)
     if err:
-        return error_response(err)
+        return _err(err)
 
-    conn = await _get_conn(device_name)
-    try:
+    async with _pooled_conn(device_name) as conn:
         response = await conn.send_command(command)
-        return ok_response(device=device_name, command=command, output=response.result)
-    finally:
-        conn.close()
+    return _ok(device=device_name, command=command, output=response.result)
+
+
+@mcp.tool()
+@_handle_device_errors
+async def cisco_show_batch(device_names: list[str], commands: list[str]) -> str:
+    """Execute several show commands on one or more Cisco devices.
+
+    Each device runs the whole batch over its pooled session. Devices are queried
+    concurrently, at most CISCO_MAX_CONCURRENCY at a time across all calls, and each
+    gets its own status so one unreachable device does not fail the sweep.
+
+    Args:
+        device_names: Names of devices from inventory
+        commands: Show commands to execute in order (each must start with 'show')
+    """
+    if not device_names:
+        return _err("No devices provided.")
+    if not commands:
+        return _err("No show commands provided.")
+
+    for command in commands:
+        err = validator.validate_readonly(command)
+        if err:
+            return _err(f"{command}: {err}")
+
+    names = list(dict.fromkeys(device_names))
+
+    async def run(device_name: str) -> list[dict[str, str]]:
+        async with _BATCH_SEM, _pooled_conn(device_name) as conn:
+            responses = await conn.send_commands(commands)
+        return [
+            {"command": command, "output": response.result}
+            for command, response in zip(commands, responses, strict=True)
+        ]
+
+    outcomes = await asyncio.gather(*(run(name) for name in names), return_exceptions=True)
+    devices: dict[str, dict[str, Any]] = {}
+    unexpected: BaseException | None = None
+    for name, outcome in zip(names, outcomes, strict=True):
+        if isinstance(outcome, _DEVICE_ERRORS):
+            devices[name] = {"status": "error", "error": _device_error(outcome)}
+        elif isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        elif isinstance(outcome, BaseException):
+            logger.error("cisco_show_batch failed on %s", name, exc_info=outcome)
+            unexpected = unexpected or outcome
+        else:
+            devices[name] = {"status": "ok", "results": outcome}
+    if unexpected is not None:
+        raise unexpected
+    return _ok(devices=devices)
 
 
 @mcp.tool()
-@handle_ssh_errors
+@_handle_device_errors
 async def cisco_configure(device_name: str, config_commands: str) -> str:
     """Apply configuration commands to a Cisco device.
 
@@ -94,29 +449,26 @@ async def cisco_configure(device_name: str, config_commands: str) -> str:
         config_commands: Configuration lines (newline-separated string).
             Do NOT include 'configure terminal' or 'end' - handled automatically.
     """
-    lines = [
-        line.rstrip()
-        for line in config_commands.strip().splitlines()
-        if line.strip() and line.strip().lower() not in {"configure terminal", "conf t", "end"}
-    ]
+    lines = []
+    for line in config_commands.strip().splitlines():
+        stripped = line.strip()
+        if stripped and stripped.lower() not in _CONFIG_WRAPPER_LINES:
+            lines.append(line.rstrip())
 
     if not lines:
-        return error_response("No config commands provided.")
+        return _err("No config commands provided.")
 
     err = validator.validate_config(lines)
     if err:
-        return error_response(err)
+        return _err(err)
 
-    conn = await _get_conn(device_name)
-    try:
+    async with _pooled_conn(device_name) as conn:
         response = await conn.send_configs(lines)
-        return ok_response(device=device_name, commands_applied=lines, output=response.result)
-    finally:
-        conn.close()
+    return _ok(device=device_name, commands_applied=lines, output=response.result)
 
 
 @mcp.tool()
-@handle_ssh_errors
+@_handle_device_errors
 async def cisco_ping(device_name: str, target: str, count: int = 5) -> str:
     """Execute a ping from a Cisco device to a target.
 
@@ -126,35 +478,66 @@ async def cisco_ping(device_name: str, target: str, count: int = 5) -> str:
         count: Number of ping packets (default 5)
     """
     command = f"ping {target} repeat {count}"
-    conn = await _get_conn(device_name)
-    try:
+    async with _pooled_conn(device_name) as conn:
         response = await conn.send_command(command, timeout_ops=120)
-        return ok_response(device=device_name, target=target, output=response.result)
-    finally:
-        conn.close()
+    return _ok(device=device_name, target=target, output=response.result)
 
 
 @mcp.tool()
-@handle_ssh_errors
-async def cisco_get_running_config(device_name: str, section: str = "") -> str:
+@_handle_device_errors
+async def cisco_get_running_config(
+    device_name: str, section: str = "", max_chars: int = 262144, offset: int = 0
+) -> str:
     """Get running configuration from a Cisco device.
 
+    Large configs are returned in pages: when 'truncated' is true, call again with
+    offset set to 'next_offset' to read the next chunk. Later pages are served from
+    the output fetched for the first page if it is under a minute old.
+
     Args:
         device_name: Name of the device from inventory
         section: Optional section filter (e.g., 'interface', 'router ospf')
+        max_chars: Maximum number of characters of output to return (default 262144)
+        offset: Character offset into the output to start from (default 0)
     """
+    if max_chars < 1 or offset < 0:
+        return _err("max_chars must be positive and offset must not be negative.")
+
     command = "show running-config"
     if section:
         command = f"show running-config | section {section}"
 
-    conn = await _get_conn(device_name)
-    try:
-        response = await conn.send_command(command)
-        return ok_response(device=device_name, command=command, output=response.result)
-    finally:
-        conn.close()
+    key = (device_name, command)
+    _purge_config_cache(time.monotonic())
+    cached = _CONFIG_CACHE.pop(key, None)
+    if offset and cached:
+        output, fetched_at = cached
+    else:
+        async with _pooled_conn(device_name) as conn:
+            response = await conn.send_command(command)
+        output, fetched_at = response.result, time.monotonic()
+
+    end = offset + max_chars
+    truncated = len(output) > end
+    if truncated:
+        while len(_CONFIG_CACHE) >= _CONFIG_CACHE_MAX_ENTRIES:
+            del _CONFIG_CACHE[next(iter(_CONFIG_CACHE))]
+        _CONFIG_CACHE[key] = (output, fetched_at)
+    return _ok(
+        device=device_name,
+        command=command,
+        output=output[offset:end],
+        offset=offset,
+        truncated=truncated,
+        next_offset=end if truncated else None,
+    )
 
 
 if __name__ == "__main__":
+    # uvloop is an optional speedup (pip install cisco-mcp-server[speedups]).
+    with suppress(ImportError):
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     logger.info("Starting Cisco MCP Server...")
     mcp.run()
@@ -2,11 +2,24 @@
 
 from __future__ import annotations
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def empty_pool(monkeypatch):
+    """Give every test its own empty connection pool."""
+    import server
+
+    monkeypatch.setattr(server, "_POOL", {})
+    monkeypatch.setattr(server, "_LOCKS", {})
+    monkeypatch.setattr(server, "_OPEN_SEM", asyncio.Semaphore(server._OPEN_CONCURRENCY))
+    monkeypatch.setattr(server, "_CONFIG_CACHE", {})
+    monkeypatch.setattr(server, "_BATCH_SEM", asyncio.Semaphore(server._MAX_CONCURRENCY))
+
+
 @pytest.fixture()
 def mock_devices(monkeypatch):
     """Populate DEVICES inventory with test entries."""
@@ -28,19 +41,26 @@ def mock_devices(monkeypatch):
             "port": 22,
         },
     }
-    monkeypatch.setattr(server, "DEVICES", test_devices)
+    monkeypatch.setattr(server, "DEVICES", {})
+    # Register the cached list response so teardown restores it with DEVICES.
+    monkeypatch.setattr(server, "_LIST_RESPONSE", server._LIST_RESPONSE)
+    server._load_devices(test_devices)
     return test_devices
 
 
 @pytest.fixture()
 def mock_scrapli_conn():
-    """Create a mock AsyncScrapli connection with send_command/send_configs."""
+    """Create a mock AsyncScrapli connection with send_command/send_commands/send_configs."""
     conn = MagicMock()
     conn.open = AsyncMock()
-    conn.close = MagicMock()
+    conn.close = AsyncMock()
+    conn.isalive = MagicMock(return_value=True)
 
     response = MagicMock()
     response.result = "mock output"
     conn.send_command = AsyncMock(return_value=response)
     conn.send_configs = AsyncMock(return_value=response)
+    conn.send_commands = AsyncMock(
+        side_effect=lambda commands: [MagicMock(result=f"{c} output") for c in commands]
+    )
     return conn
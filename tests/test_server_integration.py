@@ -7,6 +7,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+import server
 from server import _PLATFORM_MAP, mcp
 
 
@@ -16,13 +17,14 @@ class TestServerRegistration:
 
     def test_tool_count(self):
         tools = mcp._tool_manager._tools
-        assert len(tools) == 5
+        assert len(tools) == 6
 
     def test_expected_tools_registered(self):
         tools = mcp._tool_manager._tools
         expected = {
             "cisco_list_devices",
             "cisco_show",
+            "cisco_show_batch",
             "cisco_configure",
             "cisco_ping",
             "cisco_get_running_config",
@@ -42,3 +44,32 @@ class TestPlatformMap:
 
     def test_ios_defaults_to_iosxe(self):
         assert _PLATFORM_MAP["ios"] == "cisco_iosxe"
+
+
+class TestDevice:
+    def test_builds_scrapli_kwargs(self, mock_devices):
+        kwargs = server.DEVICES["switch1"].scrapli_kwargs
+        assert kwargs["host"] == "192.168.1.2"
+        assert kwargs["auth_username"] == "admin"
+        assert kwargs["auth_password"] == "secret"
+        assert kwargs["platform"] == "cisco_nxos"
+        assert kwargs["port"] == 22
+        assert kwargs["transport"] == "asyncssh"
+        assert kwargs["transport_options"]["asyncssh"] == {
+            "keepalive_interval": 30,
+            "keepalive_count_max": 3,
+        }
+
+    def test_defaults_for_sparse_entry(self):
+        dev = server.Device.from_inventory(
+            {"host": "10.0.0.1", "platform": "junos", "port": "2222"}
+        )
+        assert dev.username == "admin"
+        assert dev.port == 2222
+        assert dev.scrapli_kwargs["platform"] == "cisco_iosxe"
+
+    def test_repr_hides_password(self, mock_devices):
+        assert "secret" not in repr(server.DEVICES["router1"])
+
+    def test_uses_slots(self, mock_devices):
+        assert not hasattr(server.DEVICES["router1"], "__dict__")
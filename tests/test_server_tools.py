@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import json
 import sys
+import time
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -11,6 +12,7 @@ import pytest
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from scrapli.driver import AsyncDriver
 from scrapli.exceptions import (
     ScrapliAuthenticationFailed,
     ScrapliConnectionError,
@@ -23,6 +25,7 @@ from server import (
     cisco_list_devices,
     cisco_ping,
     cisco_show,
+    cisco_show_batch,
 )
 
 
@@ -32,6 +35,8 @@ class TestCiscoListDevices:
         import server
 
         monkeypatch.setattr(server, "DEVICES", {})
+        monkeypatch.setattr(server, "_LIST_RESPONSE", server._LIST_RESPONSE)
+        server._load_devices({})
         result = json.loads(await cisco_list_devices())
         assert result["status"] == "ok"
         assert result["devices"] == {}
@@ -43,6 +48,45 @@ class TestCiscoListDevices:
         assert result["devices"]["router1"]["host"] == "192.168.1.1"
         assert result["devices"]["router1"]["platform"] == "iosxe"
 
+    async def test_list_devices_is_cached(self, mock_devices):
+        import server
+
+        first = await cisco_list_devices()
+        assert await cisco_list_devices() is first
+
+        server._load_devices({"edge1": {"host": "10.9.9.9"}})
+        result = json.loads(await cisco_list_devices())
+        assert result["devices"] == {"edge1": {"host": "10.9.9.9", "platform": "iosxe", "port": 22}}
+
+    async def test_response_is_compact(self, mock_devices):
+        raw = await cisco_list_devices()
+        assert "\n" not in raw
+        assert raw.startswith('{"status":"ok"')
+
+
+class TestErrorPayload:
+    def test_err_matches_error_shape(self):
+        import server
+
+        raw = server._err('Blocked term "reload"')
+        assert json.loads(raw) == {"status": "error", "error": 'Blocked term "reload"'}
+        assert "\n" not in raw
+
+
+@pytest.mark.asyncio
+class TestDeviceErrorHandling:
+    @patch("server._get_conn")
+    async def test_device_errors_use_compact_payload(self, mock_get_conn, mock_devices):
+        mock_get_conn.side_effect = ScrapliTimeout("timed out")
+        raw = await cisco_show("router1", "show version")
+        assert raw == '{"status":"error","error":"Connection error: timed out"}'
+
+    @patch("server._get_conn")
+    async def test_unexpected_errors_propagate(self, mock_get_conn, mock_devices):
+        mock_get_conn.side_effect = TypeError("unexpected keyword argument")
+        with pytest.raises(TypeError):
+            await cisco_show("router1", "show version")
+
 
 @pytest.mark.asyncio
 class TestCiscoShow:
@@ -57,7 +101,7 @@ class TestCiscoShow:
         assert result["status"] == "ok"
         assert result["device"] == "router1"
         assert "17.06.05" in result["output"]
-        mock_scrapli_conn.close.assert_called_once()
+        mock_scrapli_conn.close.assert_not_called()
 
     async def test_show_rejects_non_show(self, mock_devices):
         result = json.loads(await cisco_show("router1", "configure terminal"))
@@ -98,6 +142,123 @@ class TestCiscoShow:
         assert "not in inventory" in result["error"]
 
 
+@pytest.mark.asyncio
+class TestCiscoShowBatch:
+    @patch("server._get_conn")
+    async def test_batch_success(self, mock_get_conn, mock_devices, mock_scrapli_conn):
+        mock_get_conn.return_value = mock_scrapli_conn
+        commands = ["show version", "show inventory", "show ip interface brief"]
+        result = json.loads(await cisco_show_batch(["router1"], commands))
+        assert result["status"] == "ok"
+        device = result["devices"]["router1"]
+        assert device["status"] == "ok"
+        assert [r["command"] for r in device["results"]] == commands
+        assert device["results"][1]["output"] == "show inventory output"
+        mock_scrapli_conn.send_commands.assert_awaited_once_with(commands)
+        mock_get_conn.assert_awaited_once()
+
+    @patch("server._get_conn")
+    async def test_batch_multiple_devices(self, mock_get_conn, mock_devices, mock_scrapli_conn):
+        mock_get_conn.return_value = mock_scrapli_conn
+        result = json.loads(
+            await cisco_show_batch(["router1", "switch1", "router1"], ["show version"])
+        )
+        assert list(result["devices"]) == ["router1", "switch1"]
+        assert all(d["status"] == "ok" for d in result["devices"].values())
+        assert mock_get_conn.await_count == 2
+
+    @patch("server._get_conn")
+    async def test_batch_reports_per_device_errors(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn
+    ):
+        async def get_conn(device_name):
+            if device_name == "switch1":
+                raise ScrapliAuthenticationFailed("bad creds")
+            if device_name == "bogus":
+                raise ValueError("Device 'bogus' not in inventory")
+            return mock_scrapli_conn
+
+        mock_get_conn.side_effect = get_conn
+        result = json.loads(
+            await cisco_show_batch(["router1", "switch1", "bogus"], ["show version"])
+        )
+        assert result["status"] == "ok"
+        devices = result["devices"]
+        assert devices["router1"]["status"] == "ok"
+        assert devices["switch1"]["status"] == "error"
+        assert "Authentication failed" in devices["switch1"]["error"]
+        assert "not in inventory" in devices["bogus"]["error"]
+
+    @patch("server._get_conn")
+    async def test_batch_raises_unexpected_errors(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn
+    ):
+        async def get_conn(device_name):
+            if device_name == "switch1":
+                raise TypeError("unexpected keyword argument")
+            return mock_scrapli_conn
+
+        mock_get_conn.side_effect = get_conn
+        with patch("server.logger") as logger, pytest.raises(TypeError):
+            await cisco_show_batch(["router1", "switch1"], ["show version"])
+        logger.error.assert_called_once()
+        assert logger.error.call_args.args[1] == "switch1"
+
+    @patch("server._get_conn")
+    async def test_batch_propagates_cancellation(self, mock_get_conn, mock_devices):
+        import asyncio
+
+        mock_get_conn.side_effect = asyncio.CancelledError()
+        with pytest.raises(asyncio.CancelledError):
+            await cisco_show_batch(["router1"], ["show version"])
+
+    @patch("server._get_conn")
+    async def test_batch_respects_concurrency_limit(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn, monkeypatch
+    ):
+        import asyncio
+
+        import server
+
+        monkeypatch.setattr(server, "_BATCH_SEM", asyncio.Semaphore(1))
+        in_flight = peak = 0
+
+        async def send_commands(commands):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return [MagicMock(result="") for _ in commands]
+
+        mock_scrapli_conn.send_commands.side_effect = send_commands
+        mock_get_conn.return_value = mock_scrapli_conn
+        await asyncio.gather(
+            cisco_show_batch(["router1"], ["show version"]),
+            cisco_show_batch(["switch1"], ["show version"]),
+        )
+        assert peak == 1
+
+    async def test_batch_empty_devices(self, mock_devices):
+        result = json.loads(await cisco_show_batch([], ["show version"]))
+        assert result["status"] == "error"
+        assert "No devices" in result["error"]
+
+    async def test_batch_empty_commands(self, mock_devices):
+        result = json.loads(await cisco_show_batch(["router1"], []))
+        assert result["status"] == "error"
+        assert "No show commands" in result["error"]
+
+    @patch("server._get_conn")
+    async def test_batch_rejects_any_invalid_command(self, mock_get_conn, mock_devices):
+        result = json.loads(
+            await cisco_show_batch(["router1"], ["show version", "show version | include IOS"])
+        )
+        assert result["status"] == "error"
+        assert "Pipe" in result["error"]
+        mock_get_conn.assert_not_called()
+
+
 @pytest.mark.asyncio
 class TestCiscoConfigure:
     @patch("server._get_conn")
@@ -111,7 +272,7 @@ class TestCiscoConfigure:
         assert result["status"] == "ok"
         assert len(result["commands_applied"]) == 2
         mock_scrapli_conn.send_configs.assert_called_once()
-        mock_scrapli_conn.close.assert_called_once()
+        mock_scrapli_conn.close.assert_not_called()
 
     async def test_configure_empty_commands(self, mock_devices):
         result = json.loads(await cisco_configure("router1", ""))
@@ -122,7 +283,7 @@ class TestCiscoConfigure:
         with patch("server._get_conn") as mock_get_conn:
             conn = MagicMock()
             conn.open = AsyncMock()
-            conn.close = MagicMock()
+            conn.close = AsyncMock()
             response = MagicMock()
             response.result = ""
             conn.send_configs = AsyncMock(return_value=response)
@@ -137,6 +298,22 @@ class TestCiscoConfigure:
             assert result["status"] == "ok"
             assert result["commands_applied"] == ["hostname R1"]
 
+    @patch("server._get_conn")
+    async def test_configure_keeps_indent_and_skips_blanks(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn
+    ):
+        mock_get_conn.return_value = mock_scrapli_conn
+        result = json.loads(
+            await cisco_configure(
+                "router1",
+                "conf t\ninterface Loopback0\n\n   \n ip address 1.1.1.1 255.255.255.255  \nEND",
+            )
+        )
+        assert result["commands_applied"] == [
+            "interface Loopback0",
+            " ip address 1.1.1.1 255.255.255.255",
+        ]
+
     async def test_configure_blocks_reload(self, mock_devices):
         result = json.loads(await cisco_configure("router1", "interface Gi0/0\nreload"))
         assert result["status"] == "error"
@@ -159,7 +336,7 @@ class TestCiscoPing:
         result = json.loads(await cisco_ping("router1", "8.8.8.8"))
         assert result["status"] == "ok"
         assert "100 percent" in result["output"]
-        mock_scrapli_conn.close.assert_called_once()
+        mock_scrapli_conn.close.assert_not_called()
 
     @patch("server._get_conn")
     async def test_ping_with_count(self, mock_get_conn, mock_devices, mock_scrapli_conn):
@@ -196,9 +373,246 @@ class TestCiscoGetRunningConfig:
         assert result["status"] == "ok"
         assert "section interface" in result["command"]
 
+    @patch("server._get_conn")
+    async def test_get_running_config_small_not_truncated(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn
+    ):
+        mock_get_conn.return_value = mock_scrapli_conn
+        mock_scrapli_conn.send_command.return_value.result = "hostname Router1"
+        result = json.loads(await cisco_get_running_config("router1"))
+        assert result["output"] == "hostname Router1"
+        assert result["truncated"] is False
+        assert result["next_offset"] is None
+
+    @patch("server._get_conn")
+    async def test_get_running_config_pages(self, mock_get_conn, mock_devices, mock_scrapli_conn):
+        mock_get_conn.return_value = mock_scrapli_conn
+        mock_scrapli_conn.send_command.return_value.result = "abcdefghij"
+
+        first = json.loads(await cisco_get_running_config("router1", max_chars=4))
+        assert first["output"] == "abcd"
+        assert first["truncated"] is True
+        assert first["next_offset"] == 4
+
+        last = json.loads(await cisco_get_running_config("router1", max_chars=4, offset=8))
+        assert last["output"] == "ij"
+        assert last["truncated"] is False
+        mock_scrapli_conn.send_command.assert_awaited_once()
+
+    @patch("server._get_conn")
+    async def test_get_running_config_refetches_expired_page(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn, monkeypatch
+    ):
+        import server
+
+        mock_get_conn.return_value = mock_scrapli_conn
+        mock_scrapli_conn.send_command.return_value.result = "abcdefghij"
+        await cisco_get_running_config("router1", max_chars=4)
+
+        monkeypatch.setattr(server, "_CONFIG_CACHE_TTL", 0.0)
+        page = json.loads(await cisco_get_running_config("router1", max_chars=4, offset=4))
+        assert page["output"] == "efgh"
+        assert mock_scrapli_conn.send_command.await_count == 2
+
+    @patch("server._get_conn")
+    async def test_get_running_config_drops_abandoned_pages(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn
+    ):
+        import server
+
+        mock_get_conn.return_value = mock_scrapli_conn
+        mock_scrapli_conn.send_command.return_value.result = "abcdefghij"
+        await cisco_get_running_config("router1", max_chars=4)
+        assert len(server._CONFIG_CACHE) == 1
+
+        server._purge_config_cache(time.monotonic() + server._CONFIG_CACHE_TTL)
+        assert server._CONFIG_CACHE == {}
+
+    @patch("server._get_conn")
+    async def test_get_running_config_caps_cached_pages(
+        self, mock_get_conn, mock_devices, mock_scrapli_conn, monkeypatch
+    ):
+        import server
+
+        monkeypatch.setattr(server, "_CONFIG_CACHE_MAX_ENTRIES", 2)
+        mock_get_conn.return_value = mock_scrapli_conn
+        mock_scrapli_conn.send_command.return_value.result = "abcdefghij"
+        for section in ("interface", "router ospf", "line vty"):
+            await cisco_get_running_config("router1", section=section, max_chars=4)
+        assert [command for _, command in server._CONFIG_CACHE] == [
+            "show running-config | section router ospf",
+            "show running-config | section line vty",
+        ]
+
+    async def test_get_running_config_rejects_bad_paging(self, mock_devices):
+        result = json.loads(await cisco_get_running_config("router1", max_chars=0))
+        assert result["status"] == "error"
+        result = json.loads(await cisco_get_running_config("router1", offset=-1))
+        assert result["status"] == "error"
+
     @patch("server._get_conn")
     async def test_get_running_config_auth_failed(self, mock_get_conn, mock_devices):
         mock_get_conn.side_effect = ScrapliAuthenticationFailed("denied")
         result = json.loads(await cisco_get_running_config("router1"))
         assert result["status"] == "error"
         assert "Authentication failed" in result["error"]
+
+
+@pytest.mark.asyncio
+class TestOpenConn:
+    async def test_open_conn_opens_driver(self, mock_devices):
+        import server
+
+        with patch("server.AsyncScrapli") as driver_cls:
+            driver_cls.return_value.open = AsyncMock()
+            conn = await server._open_conn(server.DEVICES["switch1"].scrapli_kwargs)
+
+        assert driver_cls.call_args.kwargs == server.DEVICES["switch1"].scrapli_kwargs
+        assert conn.comms_prompt_search_depth == server._PROMPT_SEARCH_DEPTH
+        conn.open.assert_awaited_once()
+
+    async def test_open_conn_builds_real_driver(self):
+        import server
+
+        for platform in ("iosxe", "iosxr", "nxos"):
+            dev = server.Device(host="192.168.1.1", password="secret", platform=platform)
+            with patch.object(AsyncDriver, "open", new=AsyncMock()):
+                conn = await server._open_conn(dev.scrapli_kwargs)
+            assert conn.host == "192.168.1.1"
+            assert conn.comms_prompt_search_depth == server._PROMPT_SEARCH_DEPTH
+
+    async def test_open_conn_limits_concurrent_opens(self, mock_devices, monkeypatch):
+        import asyncio
+
+        import server
+
+        monkeypatch.setattr(server, "_OPEN_SEM", asyncio.Semaphore(1))
+        in_flight = peak = 0
+
+        async def open_():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+
+        with patch("server.AsyncScrapli") as driver_cls:
+            driver_cls.return_value.open = AsyncMock(side_effect=open_)
+            await asyncio.gather(
+                server._open_conn(server.DEVICES["router1"].scrapli_kwargs),
+                server._open_conn(server.DEVICES["switch1"].scrapli_kwargs),
+            )
+        assert driver_cls.return_value.open.await_count == 2
+        assert peak == 1
+
+
+@pytest.mark.asyncio
+class TestConnectionPool:
+    @patch("server._open_conn")
+    async def test_reuses_open_connection(self, mock_create, mock_devices, mock_scrapli_conn):
+        mock_create.return_value = mock_scrapli_conn
+        await cisco_show("router1", "show version")
+        await cisco_show("router1", "show clock")
+        mock_create.assert_awaited_once()
+        assert mock_scrapli_conn.send_command.await_count == 2
+
+    @patch("server._open_conn")
+    async def test_separate_connection_per_device(
+        self, mock_create, mock_devices, mock_scrapli_conn
+    ):
+        mock_create.return_value = mock_scrapli_conn
+        await cisco_show("router1", "show version")
+        await cisco_show("switch1", "show version")
+        assert mock_create.await_count == 2
+        assert mock_create.await_args_list[1].args[0]["platform"] == "cisco_nxos"
+
+    @patch("server._open_conn")
+    async def test_reopens_dead_connection(self, mock_create, mock_devices, mock_scrapli_conn):
+        mock_create.return_value = mock_scrapli_conn
+        await cisco_show("router1", "show version")
+        mock_scrapli_conn.isalive.return_value = False
+        await cisco_show("router1", "show version")
+        assert mock_create.await_count == 2
+        mock_scrapli_conn.close.assert_awaited_once()
+
+    @patch("server._open_conn")
+    async def test_evicts_connection_on_error(self, mock_create, mock_devices, mock_scrapli_conn):
+        import server
+
+        mock_create.return_value = mock_scrapli_conn
+        mock_scrapli_conn.send_command.side_effect = ScrapliTimeout("timed out")
+        result = json.loads(await cisco_show("router1", "show version"))
+        assert result["status"] == "error"
+        assert "router1" not in server._POOL
+        mock_scrapli_conn.close.assert_awaited_once()
+
+    @patch("server._open_conn")
+    async def test_reaper_closes_idle_connection(
+        self, mock_create, mock_devices, mock_scrapli_conn
+    ):
+        import server
+
+        mock_create.return_value = mock_scrapli_conn
+        await cisco_show("router1", "show version")
+        entry = server._POOL["router1"]
+
+        await server._reap_pool(entry.last_used + 1)
+        assert "router1" in server._POOL
+
+        await server._reap_pool(entry.last_used + server._POOL_IDLE_TIMEOUT + 1)
+        assert "router1" not in server._POOL
+        mock_scrapli_conn.close.assert_awaited_once()
+
+    async def test_unknown_device_creates_no_lock(self, mock_devices):
+        import server
+
+        result = json.loads(await cisco_show("bogus", "show version"))
+        assert result["status"] == "error"
+        assert server._LOCKS == {}
+
+    @patch("server._open_conn")
+    async def test_reaper_probes_idle_connection(
+        self, mock_create, mock_devices, mock_scrapli_conn
+    ):
+        import server
+
+        mock_create.return_value = mock_scrapli_conn
+        await cisco_show("router1", "show version")
+        entry = server._POOL["router1"]
+        mock_scrapli_conn.send_command.reset_mock()
+
+        probe_at = entry.last_used + server._POOL_PROBE_INTERVAL
+        await server._reap_pool(probe_at)
+        mock_scrapli_conn.send_command.assert_awaited_once_with(
+            "", timeout_ops=server._POOL_PROBE_TIMEOUT
+        )
+        assert server._POOL["router1"] is entry
+        assert entry.last_checked == probe_at
+
+        await server._reap_pool(probe_at + 1)
+        mock_scrapli_conn.send_command.assert_awaited_once()
+
+    @patch("server._open_conn")
+    async def test_reaper_evicts_connection_failing_probe(
+        self, mock_create, mock_devices, mock_scrapli_conn
+    ):
+        import server
+
+        mock_create.return_value = mock_scrapli_conn
+        await cisco_show("router1", "show version")
+        entry = server._POOL["router1"]
+        mock_scrapli_conn.send_command.side_effect = ScrapliTimeout("no prompt")
+
+        await server._reap_pool(entry.last_used + server._POOL_PROBE_INTERVAL)
+        assert "router1" not in server._POOL
+        mock_scrapli_conn.close.assert_awaited_once()
+
+    @patch("server._open_conn")
+    async def test_close_pool(self, mock_create, mock_devices, mock_scrapli_conn):
+        import server
+
+        mock_create.return_value = mock_scrapli_conn
+        await cisco_show("router1", "show version")
+        await server._close_pool()
+        assert server._POOL == {}
+        mock_scrapli_conn.close.assert_awaited_once()